@@ -7,16 +7,68 @@ the MCP protocol, enabling automated debugging, memory inspection,
 and breakpoint-based analysis.
 """
 
+import argparse
 import json
 import os
+import pickle
 import re
 import select
+import socket
+import stat
 import subprocess
 import sys
 import threading
 import time
-from queue import Queue, Empty
-from typing import Any, Optional
+from collections import deque
+from typing import Any, NamedTuple, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encode/decode
+    orjson = None
+
+# MI record patterns, compiled once
+_RE_KV = re.compile(rb'(\w+)="([^"]*)"')
+_RE_NUMBER = re.compile(rb'number="(\d+)"')
+_RE_MSG = re.compile(rb'msg="([^"]*)"')
+_RE_VALUE = re.compile(rb'value="([^"]*)"')
+_RE_REG_NAMES = re.compile(rb'register-names=\[([^\]]*)\]')
+_RE_QUOTED = re.compile(rb'"([^"]*)"')
+_RE_REG_VALUE = re.compile(rb'\{number="(\d+)",value="((?:[^"\\]|\\.)*)"\}')
+
+# MI command lines and prefixes, pre-encoded
+_CMD_GDB_EXIT = b"-gdb-exit\n"
+_CMD_TARGET_ATTACH = b"-target-attach "
+_CMD_TARGET_DETACH = b"-target-detach\n"
+_CMD_BREAK_INSERT = b"-break-insert "
+_CMD_BREAK_DELETE = b"-break-delete "
+_CMD_EXEC_CONTINUE = b"-exec-continue\n"
+_CMD_EXEC_INTERRUPT = b"-exec-interrupt\n"
+_CMD_EVALUATE_REG = b"-data-evaluate-expression $"
+_CMD_REG_NAMES = b"-data-list-register-names\n"
+_CMD_REG_VALUES = b"-data-list-register-values x "
+_CMD_READ_MEM = b"-data-read-memory-bytes "
+
+
+def _decode(raw: bytes) -> str:
+    """Decode an MI field for the JSON response."""
+    return raw.decode("utf-8", errors="replace")
+
+
+def _mi_field(record: bytes, key: bytes, close: bytes = b'"') -> Optional[bytes]:
+    """Slice out the value following key (e.g. b'addr="') up to close.
+
+    Plain find() and slicing is much cheaper than a regex on long records
+    such as a 4096-byte memory read.
+    """
+    start = record.find(key)
+    if start < 0:
+        return None
+    start += len(key)
+    end = record.find(close, start)
+    if end < 0:
+        return None
+    return record[start:end]
 
 
 class GDBController:
@@ -24,115 +76,231 @@ class GDBController:
 
     def __init__(self):
         self.process: Optional[subprocess.Popen] = None
-        self.output_queue: Queue = Queue()
+        # Out-of-band lines, buffered only while start() waits for GDB's
+        # prompt; nothing reads them afterwards
+        self._out: deque = deque(maxlen=1024)
+        self._out_cv = threading.Condition()
+        self._awaiting_prompt = False
         self.reader_thread: Optional[threading.Thread] = None
+        self._stdin_fd: Optional[int] = None
+        self._stdout_fd: Optional[int] = None
+        # select.poll() objects, one per thread since they can't be shared
+        # concurrently. select.poll is a factory, not a type, hence Any.
+        self._poller: Any = None
+        self._reader_poller: Any = None
+        self._buf = bytearray()  # Partial MI line carried between reads
         self.running = False
         self.breakpoints: dict = {}  # bp_num -> info
         self.bp_hits: list = []  # Pending breakpoint hits
         self.attached_pid: Optional[int] = None
+        # Register/memory reads memoized until the target next runs or stops
+        self._target_stopped = False
+        self._reg_cache: dict[str, str] = {}
+        self._mem_cache: dict[tuple[str, int], str] = {}
+        # Bumped on every invalidation; a value is only cached if no run or
+        # stop was seen while it was being read
+        self._cache_gen = 0
+        self._reg_names: Optional[dict[str, int]] = None  # name -> MI register number
+        # Lock ordering: self.lock (command) > _bp_lock / _hits_lock. The short
+        # table locks may be taken while holding the command lock, never the
+        # reverse, so status and hit queries never wait on a GDB round trip.
         self.lock = threading.Lock()
+        self._bp_lock = threading.Lock()
+        self._hits_lock = threading.Lock()
+        # Set while a command owns stdout; the reader thread stays off the pipe
+        self.command_in_flight = threading.Event()
+        self._idle = threading.Condition()
         self.gdb_path = os.environ.get("GDB_PATH", "gdb")
         self.timeout = int(os.environ.get("GDB_TIMEOUT", "30"))
 
+    def _read_chunk(self) -> Optional[list[bytes]]:
+        """Read one chunk from GDB stdout and split off the complete lines.
+
+        A trailing partial line stays in the buffer for the next read.
+        Returns None at EOF.
+        """
+        chunk = os.read(self._stdout_fd, 65536)
+        if not chunk:
+            return None
+
+        buf = self._buf
+        buf += chunk
+        lines = []
+        start = 0
+        while True:
+            i = buf.find(b"\n", start)
+            if i < 0:
+                break
+            lines.append(bytes(buf[start:i]).rstrip(b"\r"))
+            start = i + 1
+        del buf[:start]
+        return lines
+
+    def _write_stdin(self, data: bytes):
+        """Write straight to GDB's stdin fd, bypassing the buffered writer."""
+        # Commands are far below PIPE_BUF, but handle short writes anyway
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._stdin_fd, view):]
+
+    def _handle_async(self, line: bytes):
+        """Handle an out-of-band line received outside a command response."""
+        if self._awaiting_prompt:
+            with self._out_cv:
+                # Re-check under the lock: start() may have just finished
+                if self._awaiting_prompt:
+                    self._out.append(line)
+                    self._out_cv.notify()
+
+        self._track_exec_state(line)
+
+    def _track_exec_state(self, line: bytes):
+        """Update target run state, caches, and breakpoint hits from an MI record."""
+        if line.startswith(b"*stopped"):
+            self._invalidate_cache()
+            # Cheap substring check before parsing; hits count for every
+            # breakpoint, including ones set through gdb_command. Recorded
+            # before the stop is flagged, so a stopped target has its hit.
+            if b'reason="breakpoint-hit"' in line:
+                self._parse_stopped(line)
+            self._target_stopped = True
+        elif line.startswith((b"*running", b"^running")):
+            self._invalidate_cache()
+            self._target_stopped = False
+
+    def _invalidate_cache(self):
+        """Drop memoized register and memory values."""
+        self._cache_gen += 1
+        self._reg_cache.clear()
+        self._mem_cache.clear()
+
     def _reader_loop(self):
-        """Background thread to read GDB output."""
+        """Background thread to read async GDB output between commands.
+
+        Commands read their own responses; this thread only drains the pipe
+        while none is outstanding, and backs off as soon as one takes the lock.
+        GDB exiting wakes the poll with POLLHUP, so no timeout is needed.
+        """
         while self.running and self.process:
             try:
-                line = self.process.stdout.readline()
-                if not line:
-                    break
-                line = line.decode("utf-8", errors="replace").rstrip()
-                self.output_queue.put(line)
+                with self._idle:
+                    while self.command_in_flight.is_set():
+                        self._idle.wait()
 
-                # Check for breakpoint hits
-                if line.startswith("*stopped"):
-                    self._parse_stopped(line)
+                if not self._reader_poller.poll() or not self.lock.acquire(blocking=False):
+                    continue
+                try:
+                    # A command may have consumed the data between the poll
+                    # and the acquire; re-check so os.read can't block while
+                    # holding the lock
+                    if not self._reader_poller.poll(0):
+                        continue
+                    lines = self._read_chunk()
+                finally:
+                    self.lock.release()
+                if lines is None:
+                    break
+                for line in lines:
+                    self._handle_async(line)
             except Exception:
                 break
 
-    def _parse_stopped(self, line: str):
-        """Parse a *stopped notification for breakpoint hits."""
-        if 'reason="breakpoint-hit"' in line:
-            hit_info = {"raw": line, "timestamp": time.time()}
+    def _parse_stopped(self, line: bytes):
+        """Parse a *stopped,reason="breakpoint-hit" notification."""
+        hit_info = {"raw": _decode(line), "timestamp": time.time()}
 
-            # Extract breakpoint number
-            match = re.search(r'bkptno="(\d+)"', line)
-            if match:
-                hit_info["bkptno"] = int(match.group(1))
+        # Extract breakpoint number
+        bkptno = _mi_field(line, b'bkptno="')
+        if bkptno and bkptno.isdigit():
+            hit_info["bkptno"] = int(bkptno)
 
-            # Extract address
-            match = re.search(r'addr="(0x[0-9a-fA-F]+)"', line)
-            if match:
-                hit_info["addr"] = match.group(1)
+        # Extract address
+        addr = _mi_field(line, b'addr="')
+        if addr and addr.startswith(b"0x"):
+            hit_info["addr"] = _decode(addr)
 
-            # Extract frame info
-            match = re.search(r'frame=\{([^}]+)\}', line)
-            if match:
-                hit_info["frame"] = match.group(1)
+        # Extract frame info
+        frame = _mi_field(line, b"frame={", b"}")
+        if frame:
+            hit_info["frame"] = _decode(frame)
 
+        with self._hits_lock:
             self.bp_hits.append(hit_info)
 
-    def _send_command(self, cmd: str) -> list:
-        """Send a command to GDB and collect response lines."""
+    def _send_command(self, cmd: bytes) -> list[bytes]:
+        """Send a newline-terminated command to GDB and collect response lines."""
         if not self.process:
             raise RuntimeError("GDB not started")
 
         with self.lock:
-            # Clear any pending output
-            while True:
-                try:
-                    self.output_queue.get_nowait()
-                except Empty:
-                    break
+            self.command_in_flight.set()
+            try:
+                # Send command
+                self._write_stdin(cmd)
+
+                # Read the response directly until we see a result record
+                lines = []
+                done = False
+                deadline = time.time() + self.timeout
+                while not done:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    if not self._poller.poll(remaining * 1000):
+                        break
+                    chunk_lines = self._read_chunk()
+                    if chunk_lines is None:
+                        break
 
-            # Send command
-            self.process.stdin.write(f"{cmd}\n".encode())
-            self.process.stdin.flush()
+                    for line in chunk_lines:
+                        # Anything after the result record is out-of-band
+                        if done:
+                            self._handle_async(line)
+                            continue
+                        lines.append(line)
 
-            # Collect response until we see a result record
-            lines = []
-            start_time = time.time()
-            while time.time() - start_time < self.timeout:
-                try:
-                    line = self.output_queue.get(timeout=0.1)
-                    lines.append(line)
+                        # Async notifications can arrive mid-response
+                        self._track_exec_state(line)
 
-                    # Result records indicate command completion
-                    if line.startswith("^"):
-                        break
-                except Empty:
-                    continue
+                        # Result records indicate command completion
+                        if line.startswith(b"^"):
+                            done = True
+            finally:
+                with self._idle:
+                    self.command_in_flight.clear()
+                    self._idle.notify()
 
             return lines
 
-    def _parse_result(self, lines: list) -> tuple[bool, str, dict]:
-        """Parse MI result lines into success, message, and data."""
+    def _parse_result(self, lines: list) -> tuple[bool, str, dict, Optional[bytes]]:
+        """Parse MI result lines into success, message, data, and the raw result line."""
         result_line = None
         for line in lines:
-            if line.startswith("^"):
+            if line.startswith(b"^"):
                 result_line = line
                 break
 
         if not result_line:
-            return False, "No result received", {}
+            return False, "No result received", {}, None
 
-        if result_line.startswith("^done"):
+        kind = result_line[:5]
+        if kind == b"^done":
             # Parse key-value pairs from result
             data = {}
             # Simple extraction of common patterns
-            for match in re.finditer(r'(\w+)="([^"]*)"', result_line):
-                data[match.group(1)] = match.group(2)
-            return True, "OK", data
+            for match in _RE_KV.finditer(result_line):
+                data[_decode(match.group(1))] = _decode(match.group(2))
+            return True, "OK", data, result_line
 
-        elif result_line.startswith("^error"):
-            match = re.search(r'msg="([^"]*)"', result_line)
-            msg = match.group(1) if match else "Unknown error"
-            return False, msg, {}
+        elif kind == b"^erro":
+            match = _RE_MSG.search(result_line)
+            msg = _decode(match.group(1)) if match else "Unknown error"
+            return False, msg, {}, result_line
 
-        elif result_line.startswith("^running"):
-            return True, "Running", {}
+        elif kind == b"^runn":
+            return True, "Running", {}, result_line
 
-        return False, f"Unknown result: {result_line}", {}
+        return False, f"Unknown result: {_decode(result_line)}", {}, result_line
 
     def start(self) -> dict:
         """Start the GDB process."""
@@ -146,19 +314,36 @@ class GDBController:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
             )
+            self._stdin_fd = self.process.stdin.fileno()
+            self._stdout_fd = self.process.stdout.fileno()
+            os.set_blocking(self._stdout_fd, True)
+            self._poller = select.poll()
+            self._poller.register(self._stdout_fd, select.POLLIN)
+            self._reader_poller = select.poll()
+            self._reader_poller.register(self._stdout_fd, select.POLLIN)
+            self._buf = bytearray()
+            self._awaiting_prompt = True
             self.running = True
             self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
             self.reader_thread.start()
 
-            # Wait for initial prompt
-            time.sleep(0.5)
+            # Wait for this session's initial prompt rather than sleeping a
+            # fixed time. The prompt ends GDB's startup output, so nothing is
+            # left over to leak into the first command's response.
+            deadline = time.time() + 2.0
+            with self._out_cv:
+                ready = False
+                while not ready:
+                    while self._out and not ready:
+                        ready = self._out.popleft().startswith(b"(gdb)")
+                    remaining = deadline - time.time()
+                    if ready or remaining <= 0:
+                        break
+                    self._out_cv.wait(remaining)
 
-            # Drain startup messages
-            while True:
-                try:
-                    self.output_queue.get_nowait()
-                except Empty:
-                    break
+                # Drain startup messages and stop buffering
+                self._out.clear()
+                self._awaiting_prompt = False
 
             return {"status": "started", "pid": self.process.pid}
         except Exception as e:
@@ -171,16 +356,20 @@ class GDBController:
 
         self.running = False
         try:
-            self.process.stdin.write(b"-gdb-exit\n")
-            self.process.stdin.flush()
+            self._write_stdin(_CMD_GDB_EXIT)
             self.process.wait(timeout=5)
         except Exception:
             self.process.kill()
 
         self.process = None
         self.attached_pid = None
-        self.breakpoints = {}
-        self.bp_hits = []
+        self._target_stopped = False
+        self._invalidate_cache()
+        self._reg_names = None
+        with self._bp_lock:
+            self.breakpoints = {}
+        with self._hits_lock:
+            self.bp_hits = []
         return {"status": "stopped"}
 
     def attach(self, pid: int) -> dict:
@@ -188,11 +377,16 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        lines = self._send_command(f"-target-attach {pid}")
-        success, msg, data = self._parse_result(lines)
+        lines = self._send_command(_CMD_TARGET_ATTACH + b"%d\n" % pid)
+        success, msg, data, _ = self._parse_result(lines)
 
         if success:
+            # Attaching stops the target
             self.attached_pid = pid
+            self._invalidate_cache()
+            self._target_stopped = True
+            # Register numbering depends on the target architecture
+            self._reg_names = None
             return {"status": "attached", "pid": pid}
         return {"error": msg}
 
@@ -203,11 +397,13 @@ class GDBController:
         if not self.attached_pid:
             return {"error": "Not attached to any process"}
 
-        lines = self._send_command("-target-detach")
-        success, msg, _ = self._parse_result(lines)
+        lines = self._send_command(_CMD_TARGET_DETACH)
+        success, msg, _, _ = self._parse_result(lines)
 
         if success:
             self.attached_pid = None
+            self._target_stopped = False
+            self._invalidate_cache()
             return {"status": "detached"}
         return {"error": msg}
 
@@ -216,27 +412,26 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        hw_flag = "-h " if hardware else ""
+        hw_flag = b"-h " if hardware else b""
         # Use *address for absolute addresses
-        addr = address if address.startswith("*") else f"*{address}"
-        lines = self._send_command(f"-break-insert {hw_flag}{addr}")
-        success, msg, data = self._parse_result(lines)
+        addr = address.encode()
+        if not addr.startswith(b"*"):
+            addr = b"*" + addr
+        lines = self._send_command(_CMD_BREAK_INSERT + hw_flag + addr + b"\n")
+        success, msg, _, result_line = self._parse_result(lines)
 
         if success:
-            # Extract breakpoint number
-            bp_num = None
-            for line in lines:
-                match = re.search(r'number="(\d+)"', line)
-                if match:
-                    bp_num = int(match.group(1))
-                    break
+            # The breakpoint number is always in the ^done,bkpt={...} record
+            match = _RE_NUMBER.search(result_line)
+            bp_num = int(match.group(1)) if match else None
 
             if bp_num:
-                self.breakpoints[bp_num] = {
-                    "address": address,
-                    "hardware": hardware,
-                    "number": bp_num,
-                }
+                with self._bp_lock:
+                    self.breakpoints[bp_num] = {
+                        "address": address,
+                        "hardware": hardware,
+                        "number": bp_num,
+                    }
                 return {"status": "breakpoint_set", "number": bp_num, "address": address}
             return {"status": "breakpoint_set", "address": address}
         return {"error": msg}
@@ -246,11 +441,12 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        lines = self._send_command(f"-break-delete {number}")
-        success, msg, _ = self._parse_result(lines)
+        lines = self._send_command(_CMD_BREAK_DELETE + b"%d\n" % number)
+        success, msg, _, _ = self._parse_result(lines)
 
         if success:
-            self.breakpoints.pop(number, None)
+            with self._bp_lock:
+                self.breakpoints.pop(number, None)
             return {"status": "breakpoint_deleted", "number": number}
         return {"error": msg}
 
@@ -259,8 +455,8 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        lines = self._send_command("-exec-continue")
-        success, msg, _ = self._parse_result(lines)
+        lines = self._send_command(_CMD_EXEC_CONTINUE)
+        success, msg, _, _ = self._parse_result(lines)
 
         if success:
             return {"status": "running"}
@@ -271,8 +467,8 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        lines = self._send_command("-exec-interrupt")
-        success, msg, _ = self._parse_result(lines)
+        lines = self._send_command(_CMD_EXEC_INTERRUPT)
+        success, msg, _, _ = self._parse_result(lines)
 
         if success:
             return {"status": "interrupted"}
@@ -283,56 +479,105 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
+        value = self._reg_cache.get(register)
+        if value is not None:
+            return {"register": register, "value": value, "cached": True}
+
         # Use data-evaluate-expression for register reading
-        lines = self._send_command(f'-data-evaluate-expression ${register}')
-        success, msg, data = self._parse_result(lines)
+        gen = self._cache_gen
+        lines = self._send_command(_CMD_EVALUATE_REG + register.encode() + b"\n")
+        success, msg, data, _ = self._parse_result(lines)
 
         if success:
             # Extract value from response
             value = data.get("value", "")
             if not value:
                 for line in lines:
-                    match = re.search(r'value="([^"]*)"', line)
+                    match = _RE_VALUE.search(line)
                     if match:
-                        value = match.group(1)
+                        value = _decode(match.group(1))
                         break
+            # Values can't change until the target runs again
+            if self.attached_pid and self._target_stopped and self._cache_gen == gen:
+                self._reg_cache[register] = value
             return {"register": register, "value": value}
         return {"error": msg}
 
-    def read_memory(self, address: str, size: int) -> dict:
-        """Read memory at an address."""
+    def read_registers(self, registers: list[str]) -> dict:
+        """Read several CPU registers (in hex) with a single GDB command."""
+        if not isinstance(registers, list) or not all(isinstance(r, str) for r in registers):
+            return {"error": "registers must be a list of register names"}
+        if not registers:
+            return {"error": "No registers specified"}
         if not self.process:
             return {"error": "GDB not started"}
+
+        if self._reg_names is None:
+            lines = self._send_command(_CMD_REG_NAMES)
+            success, msg, _, result_line = self._parse_result(lines)
+            if not success:
+                return {"error": msg}
+            match = _RE_REG_NAMES.search(result_line)
+            names = _RE_QUOTED.findall(match.group(1)) if match else []
+            # Unused register numbers have empty names
+            self._reg_names = {_decode(name): i for i, name in enumerate(names) if name}
+
+        unknown = [r for r in registers if r not in self._reg_names]
+        if unknown:
+            return {"error": f"Unknown register(s): {', '.join(unknown)}"}
+
+        numbers = b" ".join(b"%d" % self._reg_names[r] for r in registers)
+        lines = self._send_command(_CMD_REG_VALUES + numbers + b"\n")
+        success, msg, _, result_line = self._parse_result(lines)
+
+        if success:
+            values = {int(num): _decode(value) for num, value in _RE_REG_VALUE.findall(result_line)}
+            return {"registers": {r: values.get(self._reg_names[r], "") for r in registers}}
+        return {"error": msg}
+
+    def read_memory(self, address: str, size: int) -> dict:
+        """Read memory at an address."""
         if size > 4096:
             return {"error": "Size exceeds maximum (4096 bytes)"}
+        if not self.process:
+            return {"error": "GDB not started"}
+
+        contents = self._mem_cache.get((address, size))
+        if contents is not None:
+            return {"address": address, "size": size, "contents": contents, "cached": True}
 
-        lines = self._send_command(f"-data-read-memory-bytes {address} {size}")
-        success, msg, data = self._parse_result(lines)
+        gen = self._cache_gen
+        lines = self._send_command(_CMD_READ_MEM + address.encode() + b" %d\n" % size)
+        success, msg, _, result_line = self._parse_result(lines)
 
         if success:
-            # Extract memory contents
-            contents = ""
-            for line in lines:
-                match = re.search(r'contents="([0-9a-fA-F]*)"', line)
-                if match:
-                    contents = match.group(1)
-                    break
+            # Extract memory contents from the ^done,memory=[...] record.
+            # Hex digits only, so an ASCII decode is enough.
+            contents = _mi_field(result_line, b'contents="')
+            contents = contents.decode("ascii") if contents is not None else ""
+            if self.attached_pid and self._target_stopped and self._cache_gen == gen:
+                self._mem_cache[(address, size)] = contents
             return {"address": address, "size": size, "contents": contents}
         return {"error": msg}
 
     def get_hits(self) -> dict:
         """Get pending breakpoint hits and clear them."""
-        hits = self.bp_hits.copy()
-        self.bp_hits = []
+        # Swap in a fresh list so no hit appended by the reader can be lost
+        with self._hits_lock:
+            hits, self.bp_hits = self.bp_hits, []
         return {"hits": hits, "count": len(hits)}
 
     def get_status(self) -> dict:
         """Get current GDB session status."""
+        with self._bp_lock:
+            breakpoints = list(self.breakpoints.values())
+        with self._hits_lock:
+            pending_hits = len(self.bp_hits)
         return {
             "running": self.process is not None,
             "attached_pid": self.attached_pid,
-            "breakpoints": list(self.breakpoints.values()),
-            "pending_hits": len(self.bp_hits),
+            "breakpoints": breakpoints,
+            "pending_hits": pending_hits,
         }
 
     def raw_command(self, command: str) -> dict:
@@ -340,8 +585,16 @@ class GDBController:
         if not self.process:
             return {"error": "GDB not started"}
 
-        lines = self._send_command(command)
-        return {"lines": lines}
+        # A raw command may write registers or memory behind our back
+        self._invalidate_cache()
+        lines = self._send_command(command.encode() + b"\n")
+        return {"lines": [_decode(line) for line in lines]}
+
+
+class EncodedResponse(NamedTuple):
+    """A JSON-RPC response already serialized to JSON bytes."""
+
+    data: bytes
 
 
 class MCPServer:
@@ -351,6 +604,15 @@ class MCPServer:
 
     def __init__(self):
         self.gdb = GDBController()
+        self._wfile = sys.stdout.buffer
+        # Compact encoder reused across requests; both variants return bytes
+        if orjson:
+            self._encode = orjson.dumps
+            self._decode = orjson.loads
+        else:
+            encoder = json.JSONEncoder(separators=(",", ":"))
+            self._encode = lambda obj: encoder.encode(obj).encode()
+            self._decode = json.loads
         self.tools = {
             "gdb_start": {
                 "description": "Start the GDB process",
@@ -412,6 +674,20 @@ class MCPServer:
                     "required": ["register"],
                 },
             },
+            "gdb_read_registers": {
+                "description": "Read several CPU register values (hex) in one round trip",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "registers": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Register names (e.g., [\"rax\", \"rbx\", \"rip\"])",
+                        }
+                    },
+                    "required": ["registers"],
+                },
+            },
             "gdb_read_memory": {
                 "description": "Read memory at an address",
                 "inputSchema": {
@@ -440,8 +716,34 @@ class MCPServer:
                 },
             },
         }
+        gdb = self.gdb
+        self._dispatch = {
+            "gdb_start": lambda a: gdb.start(),
+            "gdb_stop": lambda a: gdb.stop(),
+            "gdb_attach": lambda a: gdb.attach(a["pid"]),
+            "gdb_detach": lambda a: gdb.detach(),
+            "gdb_breakpoint": lambda a: gdb.set_breakpoint(a["address"], a.get("hardware", False)),
+            "gdb_delete_breakpoint": lambda a: gdb.delete_breakpoint(a["number"]),
+            "gdb_continue": lambda a: gdb.continue_exec(),
+            "gdb_interrupt": lambda a: gdb.interrupt(),
+            "gdb_read_register": lambda a: gdb.read_register(a["register"]),
+            "gdb_read_registers": lambda a: gdb.read_registers(a["registers"]),
+            "gdb_read_memory": lambda a: gdb.read_memory(a["address"], a["size"]),
+            "gdb_get_hits": lambda a: gdb.get_hits(),
+            "gdb_status": lambda a: gdb.get_status(),
+            "gdb_command": lambda a: gdb.raw_command(a["command"]),
+        }
+        # The tool list is static, so serialize the tools/list result once
+        self._tools_list_bytes = self._encode(
+            {
+                "tools": [
+                    {"name": name, "description": info["description"], "inputSchema": info["inputSchema"]}
+                    for name, info in self.tools.items()
+                ]
+            }
+        )
 
-    def handle_request(self, request: dict) -> dict:
+    def handle_request(self, request: dict) -> Optional[Union[dict, EncodedResponse]]:
         """Handle an incoming JSON-RPC request."""
         method = request.get("method", "")
         params = request.get("params", {})
@@ -471,13 +773,11 @@ class MCPServer:
             },
         }
 
-    def _list_tools(self, req_id: Any) -> dict:
-        """Handle tools/list request."""
-        tools_list = [
-            {"name": name, "description": info["description"], "inputSchema": info["inputSchema"]}
-            for name, info in self.tools.items()
-        ]
-        return {"jsonrpc": "2.0", "id": req_id, "result": {"tools": tools_list}}
+    def _list_tools(self, req_id: Any) -> EncodedResponse:
+        """Handle tools/list request with the pre-serialized result."""
+        return EncodedResponse(
+            b'{"jsonrpc":"2.0","id":' + self._encode(req_id) + b',"result":' + self._tools_list_bytes + b"}"
+        )
 
     def _call_tool(self, req_id: Any, params: dict) -> dict:
         """Handle tools/call request."""
@@ -492,68 +792,57 @@ class MCPServer:
             return {
                 "jsonrpc": "2.0",
                 "id": req_id,
-                "result": {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]},
+                "result": {"content": [{"type": "text", "text": self._encode(result).decode()}]},
             }
         except Exception as e:
             return {
                 "jsonrpc": "2.0",
                 "id": req_id,
-                "result": {"content": [{"type": "text", "text": json.dumps({"error": str(e)})}], "isError": True},
+                "result": {
+                    "content": [{"type": "text", "text": self._encode({"error": str(e)}).decode()}],
+                    "isError": True,
+                },
             }
 
     def _execute_tool(self, name: str, args: dict) -> dict:
         """Execute a tool and return the result."""
-        if name == "gdb_start":
-            return self.gdb.start()
-        elif name == "gdb_stop":
-            return self.gdb.stop()
-        elif name == "gdb_attach":
-            return self.gdb.attach(args["pid"])
-        elif name == "gdb_detach":
-            return self.gdb.detach()
-        elif name == "gdb_breakpoint":
-            return self.gdb.set_breakpoint(args["address"], args.get("hardware", False))
-        elif name == "gdb_delete_breakpoint":
-            return self.gdb.delete_breakpoint(args["number"])
-        elif name == "gdb_continue":
-            return self.gdb.continue_exec()
-        elif name == "gdb_interrupt":
-            return self.gdb.interrupt()
-        elif name == "gdb_read_register":
-            return self.gdb.read_register(args["register"])
-        elif name == "gdb_read_memory":
-            return self.gdb.read_memory(args["address"], args["size"])
-        elif name == "gdb_get_hits":
-            return self.gdb.get_hits()
-        elif name == "gdb_status":
-            return self.gdb.get_status()
-        elif name == "gdb_command":
-            return self.gdb.raw_command(args["command"])
-        else:
+        handler = self._dispatch.get(name)
+        if handler is None:
             return {"error": f"Tool not implemented: {name}"}
+        return handler(args)
 
     def _error(self, req_id: Any, code: int, message: str) -> dict:
         """Create an error response."""
         return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
 
-    def run(self):
-        """Main server loop - read from stdin, write to stdout."""
-        while True:
+    def _write(self, response: Union[dict, EncodedResponse]):
+        """Write a newline-framed JSON-RPC message to the output stream."""
+        if isinstance(response, EncodedResponse):
+            payload = response.data
+        else:
+            payload = self._encode(response)
+        out = self._wfile
+        out.write(payload)
+        out.write(b"\n")
+        out.flush()
+
+    def run(self, rfile=None, wfile=None):
+        """Main server loop - read requests from rfile (stdin), write responses to wfile (stdout)."""
+        # Requests are newline-framed JSON; parse the raw bytes without decoding
+        if rfile is None:
+            rfile = sys.stdin.buffer
+            os.set_blocking(rfile.fileno(), True)
+        self._wfile = wfile if wfile is not None else sys.stdout.buffer
+        for line in iter(rfile.readline, b""):
             try:
-                line = sys.stdin.readline()
-                if not line:
-                    break
-
-                line = line.strip()
-                if not line:
+                if line.isspace():
                     continue
 
-                request = json.loads(line)
+                request = self._decode(line)
                 response = self.handle_request(request)
 
                 if response:  # Notifications don't get responses
-                    sys.stdout.write(json.dumps(response) + "\n")
-                    sys.stdout.flush()
+                    self._write(response)
 
             except json.JSONDecodeError as e:
                 error_response = {
@@ -561,21 +850,104 @@ class MCPServer:
                     "id": None,
                     "error": {"code": -32700, "message": f"Parse error: {e}"},
                 }
-                sys.stdout.write(json.dumps(error_response) + "\n")
-                sys.stdout.flush()
+                self._write(error_response)
             except Exception as e:
                 error_response = {
                     "jsonrpc": "2.0",
                     "id": None,
                     "error": {"code": -32603, "message": f"Internal error: {e}"},
                 }
-                sys.stdout.write(json.dumps(error_response) + "\n")
-                sys.stdout.flush()
+                self._write(error_response)
+
+    def run_pickle(self, rfile=None, wfile=None):
+        """Serve length-prefixed pickled requests (test harness framing, see --test-proto).
+
+        Each message is a 4-byte little-endian length followed by a pickled
+        request or response dict. Only for trusted local clients: unpickling
+        input can run arbitrary code.
+        """
+        if rfile is None:
+            rfile = sys.stdin.buffer
+            os.set_blocking(rfile.fileno(), True)
+        wfile = wfile if wfile is not None else sys.stdout.buffer
+        while True:
+            header = rfile.read(4)
+            if len(header) < 4:
+                break
+            try:
+                request = pickle.loads(rfile.read(int.from_bytes(header, "little")))
+                response = self.handle_request(request)
+                if response is None:
+                    continue
+                if isinstance(response, EncodedResponse):
+                    response = self._decode(response.data)
+            except Exception as e:
+                response = {"jsonrpc": "2.0", "id": None, "error": {"code": -32603, "message": f"Internal error: {e}"}}
+
+            payload = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+            wfile.write(len(payload).to_bytes(4, "little") + payload)
+            wfile.flush()
+
+    def serve_unix(self, path: str):
+        """Accept a single client on a UNIX socket at path and serve it.
+
+        A stale socket left at path is replaced; anything else there raises
+        FileExistsError rather than being deleted.
+        """
+        try:
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise FileExistsError(f"{path} exists and is not a socket")
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        bound = False
+        try:
+            # Any client gets full GDB (and so shell) access; make the socket
+            # owner-only from the moment it exists
+            old_umask = os.umask(0o077)
+            try:
+                listener.bind(path)
+                bound = True
+            finally:
+                os.umask(old_umask)
+            listener.listen(1)
+            conn, _ = listener.accept()
+        finally:
+            listener.close()
+            if bound:
+                os.unlink(path)
+
+        with conn:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+            with conn.makefile("rb", buffering=65536) as rfile, conn.makefile("wb", buffering=65536) as wfile:
+                self.run(rfile, wfile)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="GDB MCP server")
+    parser.add_argument("--listen", metavar="PATH", help="serve one client over a UNIX socket at PATH instead of stdio")
+    parser.add_argument(
+        "--test-proto",
+        choices=["json", "pickle"],
+        default="json",
+        help="stdio framing: newline-delimited JSON-RPC (default) or length-prefixed pickle for the test harness",
+    )
+    args = parser.parse_args()
+    if args.listen and args.test_proto != "json":
+        parser.error("--test-proto=pickle is only supported over stdio")
+
     server = MCPServer()
-    server.run()
+    if args.listen:
+        try:
+            server.serve_unix(args.listen)
+        except FileExistsError as e:
+            parser.error(str(e))
+    elif args.test_proto == "pickle":
+        server.run_pickle()
+    else:
+        server.run()
 
 
 if __name__ == "__main__":
@@ -3,44 +3,267 @@
 Test suite for GDB MCP Server.
 """
 
+import asyncio
+import functools
 import json
+import pickle
+import shutil
+import socket
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import unittest
 import os
 
+# The in-process tests import, and the subprocess tests run, the same copy
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gdb_mcp_server.py")
+sys.path.insert(0, os.path.dirname(SERVER_PATH))
+import gdb_mcp_server  # noqa: E402
 
-class TestMCPProtocol(unittest.TestCase):
-    """Test MCP protocol compliance."""
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encode/decode
+    orjson = None
 
-    def setUp(self):
-        self.server = subprocess.Popen(
-            [sys.executable, "/root/gdb/gdb_mcp_server.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+if orjson:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+
+def _yama_ptrace_scope() -> int:
+    """Return the Yama ptrace_scope setting, or 0 if Yama is not enabled."""
+    try:
+        with open("/proc/sys/kernel/yama/ptrace_scope") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+
+# Capabilities checked once, so tests that cannot work are skipped up front
+# instead of failing slowly inside GDB
+HAS_GDB = shutil.which(os.environ.get("GDB_PATH", "gdb")) is not None
+HAS_PTRACE = os.geteuid() == 0 or _yama_ptrace_scope() == 0
+
+# Buffer size for the server's stdio pipes: large enough that a pipelined
+# batch of responses, or a big gdb_command result, comes in with one read().
+_PIPE_BUFSIZE = 65536
+
+# Pre-encoded static parts of a tools/call request; only the ID, tool name
+# and arguments are filled in per call.
+_CALL_PREFIX = b'{"jsonrpc":"2.0","method":"tools/call","id":%d,"params":{"name":"%b","arguments":'
+_CALL_SUFFIX = b"}}\n"
+_REQUEST_SUFFIX = b"}\n"
+_PARAMS_KEY = b',"params":'
+_request_templates: dict = {}  # method -> pre-encoded request prefix
+
+# Requests are encoded as lists of buffers and written with os.writev, so
+# the static parts are never concatenated with the per-call JSON
+_IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+
+def _call_iov(req_id: int, name: str, arguments: dict = None) -> list:
+    """Encode one newline-terminated tools/call request as a list of buffers."""
+    return [_CALL_PREFIX % (req_id, name.encode()), _dumps(arguments or {}), _CALL_SUFFIX]
+
+
+def _request_iov(req_id: int, method: str, params: dict = None) -> list:
+    """Encode one newline-terminated JSON-RPC request as a list of buffers."""
+    template = _request_templates.get(method)
+    if template is None:
+        template = _request_templates[method] = b'{"jsonrpc":"2.0","method":"%b","id":%%d' % method.encode()
+    if params:
+        return [template % req_id, _PARAMS_KEY, _dumps(params), _REQUEST_SUFFIX]
+    return [template % req_id, _REQUEST_SUFFIX]
+
+
+def _writev_all(fd: int, buffers: list):
+    """Write all buffers to fd, in as few writev calls as IOV_MAX allows."""
+    for start in range(0, len(buffers), _IOV_MAX):
+        chunk = buffers[start : start + _IOV_MAX]
+        written = os.writev(fd, chunk)
+        if written < sum(map(len, chunk)):
+            # Short write; finish the remainder of this chunk byte-wise
+            rest = memoryview(b"".join(chunk))[written:]
+            while rest:
+                rest = rest[os.write(fd, rest) :]
+
+
+def _tool_result(response: dict) -> dict:
+    """Unwrap a tools/call response to the tool's own JSON result."""
+    if "result" in response and "content" in response["result"]:
+        return _loads(response["result"]["content"][0]["text"])
+    return response
+
+
+_server: subprocess.Popen = None  # shared stdio server, see setUpModule
+
+
+def setUpModule():
+    # One stdio server for the whole module; tests reset it with gdb_stop
+    global _server
+    _server = subprocess.Popen(
+        [sys.executable, SERVER_PATH],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        bufsize=_PIPE_BUFSIZE,
+    )
+
+
+def tearDownModule():
+    _server.terminate()
+    _server.wait()
+    _server.stdin.close()
+    _server.stdout.close()
+
+
+def async_test(fn):
+    """Run an ``async def`` test method on its class's event loop."""
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        return self.loop.run_until_complete(fn(self, *args, **kwargs))
+
+    return wrapper
+
+
+class _AsyncRPC:
+    """Asyncio JSON-RPC client over a server subprocess's stdio pipes.
+
+    Responses are matched to requests by ID, so independent requests can be
+    in flight together (e.g. via ``asyncio.gather``).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, server: subprocess.Popen):
+        self.loop = loop
+        self.server = server
+        self._pending: dict = {}  # req_id -> Future
+        self._next_id = 0
+
+    async def connect(self):
+        # The transports own and close duplicates of the server's pipe fds,
+        # so the shared server's pipe objects stay usable after close()
+        reader = asyncio.StreamReader(limit=1 << 20)
+        self._read_transport, _ = await self.loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader),
+            open(os.dup(self.server.stdout.fileno()), "rb", buffering=0),
         )
+        self._transport, _ = await self.loop.connect_write_pipe(
+            asyncio.Protocol, open(os.dup(self.server.stdin.fileno()), "wb", buffering=0)
+        )
+        self._demux = self.loop.create_task(self._read_responses(reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            response = _loads(line)
+            future = self._pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._pending.values():
+            future.set_exception(EOFError("server closed stdout"))
+
+    async def rpc(self, method: str, params: dict = None) -> dict:
+        """Send a JSON-RPC request and await its response."""
+        self._next_id += 1
+        future = self.loop.create_future()
+        self._pending[self._next_id] = future
+        self._transport.writelines(_request_iov(self._next_id, method, params))
+        return await future
+
+    async def close(self):
+        self._demux.cancel()
+        try:
+            await self._demux
+        except asyncio.CancelledError:
+            pass
+        self._read_transport.close()
+        self._transport.close()
+        await asyncio.sleep(0)  # let the transports close their pipes
+        # asyncio made the (shared) pipes non-blocking; restore them
+        os.set_blocking(self.server.stdout.fileno(), True)
+        os.set_blocking(self.server.stdin.fileno(), True)
+
+
+class _RPCMixin:
+    """Blocking JSON-RPC helpers for test classes.
+
+    Classes set ``rfile``/``wfile`` to the server's binary output/input
+    streams. Each batch goes out with os.writev on wfile's descriptor,
+    bypassing its buffer, and request IDs count up from 1 in batch order.
+    """
+
+    rfile = None
+    wfile = None
 
     def tearDown(self):
-        self.server.terminate()
-        self.server.wait()
+        # Stop GDB if running; the server itself is shared across tests
+        try:
+            self.call_tool("gdb_stop")
+        except Exception:
+            pass
+        super().tearDown()
+
+    def _exchange(self, buffers: list, count: int) -> dict:
+        _writev_all(self.wfile.fileno(), buffers)
+        responses = {}
+        for _ in range(count):
+            response = _loads(self.rfile.readline())
+            responses[response.get("id")] = response
+        return responses
 
-    def send_request(self, method: str, params: dict = None, req_id: int = 1) -> dict:
-        """Send a JSON-RPC request and get response."""
-        request = {"jsonrpc": "2.0", "method": method, "id": req_id}
-        if params:
-            request["params"] = params
+    def call_tool(self, name: str, arguments: dict = None) -> dict:
+        """Call a tool and return parsed result."""
+        return self.call_tool_batch([(name, arguments)])[1]
+
+    def call_tool_batch(self, calls: list) -> dict:
+        """Pipeline (name, arguments) tool calls and return parsed results keyed by request ID."""
+        buffers = [
+            buf for req_id, (name, arguments) in enumerate(calls, start=1) for buf in _call_iov(req_id, name, arguments)
+        ]
+        responses = self._exchange(buffers, len(calls))
+        return {req_id: _tool_result(response) for req_id, response in responses.items()}
+
+    def _send_pickle(self, obj):
+        """Write one length-prefixed pickled message (--test-proto=pickle)."""
+        buf = pickle.dumps(obj, protocol=5)
+        _writev_all(self.wfile.fileno(), [len(buf).to_bytes(4, "little"), buf])
+
+    def _recv_pickle(self):
+        """Read one length-prefixed pickled message (--test-proto=pickle)."""
+        n = int.from_bytes(self.rfile.read(4), "little")
+        return pickle.loads(self.rfile.read(n))
 
-        self.server.stdin.write(json.dumps(request).encode() + b"\n")
-        self.server.stdin.flush()
 
-        response_line = self.server.stdout.readline()
-        return json.loads(response_line)
+class TestMCPProtocol(unittest.TestCase):
+    """Test MCP protocol compliance."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _server
+        cls.loop = asyncio.new_event_loop()
+        cls.client = _AsyncRPC(cls.loop, cls.server)
+        cls.loop.run_until_complete(cls.client.connect())
 
-    def test_initialize(self):
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.run_until_complete(cls.client.close())
+        cls.loop.close()
+
+    @async_test
+    async def test_initialize(self):
         """Test initialize handshake."""
-        response = self.send_request(
+        response = await self.client.rpc(
             "initialize",
             {"protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "test", "version": "1.0"}},
         )
@@ -51,9 +274,10 @@ class TestMCPProtocol(unittest.TestCase):
         self.assertIn("capabilities", response["result"])
         self.assertIn("serverInfo", response["result"])
 
-    def test_tools_list(self):
+    @async_test
+    async def test_tools_list(self):
         """Test tools/list returns all expected tools."""
-        response = self.send_request("tools/list")
+        response = await self.client.rpc("tools/list")
 
         self.assertIn("result", response)
         tools = response["result"]["tools"]
@@ -69,6 +293,7 @@ class TestMCPProtocol(unittest.TestCase):
             "gdb_continue",
             "gdb_interrupt",
             "gdb_read_register",
+            "gdb_read_registers",
             "gdb_read_memory",
             "gdb_get_hits",
             "gdb_status",
@@ -77,50 +302,60 @@ class TestMCPProtocol(unittest.TestCase):
 
         self.assertEqual(tool_names, expected_tools)
 
-    def test_unknown_method(self):
+    @async_test
+    async def test_unknown_method(self):
         """Test error handling for unknown method."""
-        response = self.send_request("unknown/method")
+        # Issued alongside a valid request; each response must reach its caller
+        response, tools = await asyncio.gather(self.client.rpc("unknown/method"), self.client.rpc("tools/list"))
 
         self.assertIn("error", response)
         self.assertEqual(response["error"]["code"], -32601)
+        self.assertIn("result", tools)
 
 
-class TestGDBOperations(unittest.TestCase):
+class TestGDBOperations(_RPCMixin, unittest.TestCase):
     """Test GDB operations through MCP."""
 
-    def setUp(self):
-        self.server = subprocess.Popen(
-            [sys.executable, "/root/gdb/gdb_mcp_server.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+    @classmethod
+    def setUpClass(cls):
+        # Talk to this server over its UNIX socket transport instead of stdio
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmpdir.name, "gdbmcp.sock")
+        cls.server = subprocess.Popen(
+            [sys.executable, SERVER_PATH, "--listen", path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
-
-    def tearDown(self):
-        # Stop GDB if running
-        self.call_tool("gdb_stop")
-        self.server.terminate()
-        self.server.wait()
-
-    def call_tool(self, name: str, arguments: dict = None) -> dict:
-        """Call a tool and return parsed result."""
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "id": 1,
-            "params": {"name": name, "arguments": arguments or {}},
-        }
-
-        self.server.stdin.write(json.dumps(request).encode() + b"\n")
-        self.server.stdin.flush()
-
-        response_line = self.server.stdout.readline()
-        response = json.loads(response_line)
-
-        if "result" in response and "content" in response["result"]:
-            return json.loads(response["result"]["content"][0]["text"])
-        return response
-
+        cls.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        cls.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        # The server unlinks the path once it accepts, so record the mode
+        # before connecting
+        deadline = time.monotonic() + 5
+        cls.socket_mode = None
+        while True:
+            try:
+                if cls.socket_mode is None:
+                    cls.socket_mode = os.stat(path).st_mode & 0o777
+                cls.sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        cls.rfile = cls.sock.makefile("rb", buffering=_PIPE_BUFSIZE)
+        cls.wfile = cls.sock.makefile("wb", buffering=_PIPE_BUFSIZE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.rfile.close()
+        cls.wfile.close()
+        cls.sock.close()
+        cls.server.terminate()
+        cls.server.wait()
+        cls.tmpdir.cleanup()
+
+    @unittest.skipUnless(HAS_GDB, "gdb not installed")
     def test_gdb_start_stop(self):
         """Test starting and stopping GDB."""
         # Start
@@ -141,12 +376,46 @@ class TestGDBOperations(unittest.TestCase):
         status = self.call_tool("gdb_status")
         self.assertFalse(status["running"])
 
+    def test_socket_is_owner_only(self):
+        """Test that the --listen socket is not accessible to other users."""
+        self.assertEqual(self.socket_mode & 0o077, 0, oct(self.socket_mode))
+
+    def test_listen_refuses_non_socket_path(self):
+        """Test that --listen fails instead of deleting a file that is not a socket."""
+        path = os.path.join(self.tmpdir.name, "notes.txt")
+        with open(path, "w") as f:
+            f.write("keep me")
+        result = subprocess.run(
+            [sys.executable, SERVER_PATH, "--listen", path],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=10,
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn(b"not a socket", result.stderr)
+        with open(path) as f:
+            self.assertEqual(f.read(), "keep me")
+
     def test_gdb_not_started_error(self):
         """Test error when GDB not started."""
         result = self.call_tool("gdb_attach", {"pid": 1})
         self.assertIn("error", result)
         self.assertIn("not started", result["error"].lower())
 
+    def test_memory_size_limit(self):
+        """Test memory read size limit."""
+        # The limit is checked before GDB is involved, so no gdb_start
+        result = self.call_tool("gdb_read_memory", {"address": "0x0", "size": 8192})
+        self.assertIn("error", result)
+        self.assertIn("4096", result["error"])
+
+    def test_read_registers_argument_type(self):
+        """Test that gdb_read_registers rejects anything but a list of names."""
+        for registers in ("rip", ["rip", 1], None):
+            with self.subTest(registers=registers):
+                result = self.call_tool("gdb_read_registers", {"registers": registers})
+                self.assertIn("list of register names", result.get("error", ""))
+
     def test_gdb_status_initial(self):
         """Test initial status."""
         status = self.call_tool("gdb_status")
@@ -156,141 +425,368 @@ class TestGDBOperations(unittest.TestCase):
         self.assertEqual(status["pending_hits"], 0)
 
 
-class TestGDBAttachDebug(unittest.TestCase):
+# Attach target: dies with the test process (PR_SET_PDEATHSIG) so a crashed
+# run cannot leak it, and writes a ready byte once it is about to sleep
+_TARGET_SCRIPT = """
+import ctypes, os, signal, time
+ctypes.CDLL(None).prctl(1, signal.SIGKILL)  # PR_SET_PDEATHSIG
+os.write(1, b"R\\n")
+time.sleep(300)
+"""
+
+
+@unittest.skipUnless(HAS_GDB, "gdb not installed")
+@unittest.skipUnless(HAS_PTRACE, "ptrace unavailable")
+class TestGDBAttachDebug(_RPCMixin, unittest.TestCase):
     """Test GDB attach and debugging with a real process."""
 
-    def setUp(self):
-        # Start a simple target process
-        self.target = subprocess.Popen(
-            ["sleep", "300"],
+    @classmethod
+    def setUpClass(cls):
+        # Start the target process, shared by all tests in the class
+        cls.target = subprocess.Popen(
+            [sys.executable, "-c", _TARGET_SCRIPT],
+            stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        if cls.target.stdout.readline() != b"R\n":
+            cls.target.kill()
+            cls.target.wait()
+            raise RuntimeError("attach target failed to start")
+
+        cls.rfile, cls.wfile = _server.stdout, _server.stdin
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.target.terminate()
+        cls.target.wait()
+        cls.target.stdout.close()
+
+    def test_attached_session(self):
+        """Test attach, register/memory reads, and detach on one attached session."""
+        # Start GDB and attach once; ptrace attach is the slowest step
+        results = self.call_tool_batch(
+            [
+                ("gdb_start", None),
+                ("gdb_attach", {"pid": self.target.pid}),
+                ("gdb_status", None),
+                ("gdb_read_register", {"register": "rip"}),
+                ("gdb_read_registers", {"registers": ["rip", "rsp"]}),
+            ]
         )
-        time.sleep(0.1)  # Let it start
 
-        self.server = subprocess.Popen(
-            [sys.executable, "/root/gdb/gdb_mcp_server.py"],
+        with self.subTest(name="attach"):
+            result = results[2]
+            self.assertEqual(result.get("status"), "attached")
+            self.assertEqual(result.get("pid"), self.target.pid)
+
+            # Check status
+            status = results[3]
+            self.assertEqual(status["attached_pid"], self.target.pid)
+
+        with self.subTest(name="read_register"):
+            # Read instruction pointer
+            result = results[4]
+            self.assertEqual(result.get("register"), "rip")
+            self.assertIn("value", result)
+            # Value should be a hex address
+            self.assertTrue(result["value"].startswith("0x") or result["value"].isdigit())
+
+        with self.subTest(name="read_registers"):
+            result = results[5]
+            self.assertEqual(set(result.get("registers", {})), {"rip", "rsp"})
+            self.assertTrue(result["registers"]["rip"].startswith("0x"))
+
+        with self.subTest(name="read_memory"):
+            # Read memory at RIP
+            rip = results[4].get("value", "0")
+            result = self.call_tool("gdb_read_memory", {"address": rip, "size": 16})
+            self.assertEqual(result.get("address"), rip)
+            self.assertEqual(result.get("size"), 16)
+            # Contents should be hex string
+            self.assertIn("contents", result)
+
+        with self.subTest(name="detach"):
+            results = self.call_tool_batch([("gdb_detach", None), ("gdb_status", None)])
+            self.assertEqual(results[1].get("status"), "detached")
+
+            # Check status after detach
+            self.assertIsNone(results[2]["attached_pid"])
+
+
+class TestPickleProto(_RPCMixin, unittest.TestCase):
+    """Test the server's length-prefixed pickle framing for test clients."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = subprocess.Popen(
+            [sys.executable, SERVER_PATH, "--test-proto", "pickle"],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=_PIPE_BUFSIZE,
         )
+        cls.rfile, cls.wfile = cls.server.stdout, cls.server.stdin
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait()
+        cls.server.stdin.close()
+        cls.server.stdout.close()
+
+    def call_tool_batch(self, calls: list) -> dict:
+        for req_id, (name, arguments) in enumerate(calls, start=1):
+            self._send_pickle(
+                {
+                    "jsonrpc": "2.0",
+                    "method": "tools/call",
+                    "id": req_id,
+                    "params": {"name": name, "arguments": arguments or {}},
+                }
+            )
+        responses = [self._recv_pickle() for _ in calls]
+        return {response["id"]: _tool_result(response) for response in responses}
 
-    def tearDown(self):
-        self.call_tool("gdb_stop")
-        self.server.terminate()
-        self.server.wait()
-        self.target.terminate()
-        self.target.wait()
-
-    def call_tool(self, name: str, arguments: dict = None) -> dict:
-        """Call a tool and return parsed result."""
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "id": 1,
-            "params": {"name": name, "arguments": arguments or {}},
-        }
-
-        self.server.stdin.write(json.dumps(request).encode() + b"\n")
-        self.server.stdin.flush()
-
-        response_line = self.server.stdout.readline()
-        response = json.loads(response_line)
-
-        if "result" in response and "content" in response["result"]:
-            return json.loads(response["result"]["content"][0]["text"])
-        return response
-
-    def test_attach_detach(self):
-        """Test attaching to and detaching from a process."""
-        # Start GDB
-        self.call_tool("gdb_start")
-
-        # Attach
-        result = self.call_tool("gdb_attach", {"pid": self.target.pid})
-        self.assertEqual(result.get("status"), "attached")
-        self.assertEqual(result.get("pid"), self.target.pid)
-
-        # Check status
-        status = self.call_tool("gdb_status")
-        self.assertEqual(status["attached_pid"], self.target.pid)
-
-        # Detach
-        result = self.call_tool("gdb_detach")
-        self.assertEqual(result.get("status"), "detached")
-
-        # Check status after detach
-        status = self.call_tool("gdb_status")
-        self.assertIsNone(status["attached_pid"])
-
-    def test_read_register(self):
-        """Test reading CPU registers."""
-        self.call_tool("gdb_start")
-        self.call_tool("gdb_attach", {"pid": self.target.pid})
-
-        # Read instruction pointer
-        result = self.call_tool("gdb_read_register", {"register": "rip"})
-        self.assertEqual(result.get("register"), "rip")
-        self.assertIn("value", result)
-        # Value should be a hex address
-        self.assertTrue(result["value"].startswith("0x") or result["value"].isdigit())
-
-    def test_read_memory(self):
-        """Test reading memory."""
-        self.call_tool("gdb_start")
-        self.call_tool("gdb_attach", {"pid": self.target.pid})
-
-        # Get current instruction pointer
-        reg_result = self.call_tool("gdb_read_register", {"register": "rip"})
-        rip = reg_result.get("value", "0")
-
-        # Read memory at RIP
-        result = self.call_tool("gdb_read_memory", {"address": rip, "size": 16})
-        self.assertEqual(result.get("address"), rip)
-        self.assertEqual(result.get("size"), 16)
-        # Contents should be hex string
-        self.assertIn("contents", result)
-
-    def test_memory_size_limit(self):
-        """Test memory read size limit."""
-        self.call_tool("gdb_start")
-
-        # Try to read more than 4096 bytes
-        result = self.call_tool("gdb_read_memory", {"address": "0x0", "size": 8192})
-        self.assertIn("error", result)
-        self.assertIn("4096", result["error"])
+    def test_tools_list(self):
+        """Test that the pre-encoded tools/list result is framed as a dict."""
+        self._send_pickle({"jsonrpc": "2.0", "method": "tools/list", "id": 1})
+        response = self._recv_pickle()
+        self.assertEqual(response["id"], 1)
+        names = {tool["name"] for tool in response["result"]["tools"]}
+        self.assertIn("gdb_status", names)
+
+    def test_tool_calls(self):
+        """Test pipelined tool calls over pickle framing."""
+        results = self.call_tool_batch(
+            [
+                ("gdb_status", None),
+                ("gdb_read_memory", {"address": "0x0", "size": 8192}),
+            ]
+        )
+        self.assertFalse(results[1]["running"])
+        self.assertIn("4096", results[2]["error"])
+
+
+# Minimal scripted GDB/MI responder, so controller behaviour that depends on
+# timing or on target state can be tested without GDB or ptrace. Each
+# -exec-continue moves the fake pc on and reports *stopped shortly after.
+_FAKE_GDB = r"""
+import sys, threading
+
+lock = threading.Lock()
+pc = 0x401000
+bkpt = False
+
+
+def emit(*lines):
+    with lock:
+        sys.stdout.write("".join(line + "\n" for line in lines))
+        sys.stdout.flush()
+
+
+def stopped():
+    reason = 'breakpoint-hit",bkptno="1' if bkpt else "end-stepping-range"
+    emit('*stopped,reason="%s",frame={addr="0x%x"}' % (reason, pc), "(gdb)")
+
+
+emit('=thread-group-added,id="i1"', "(gdb)")
+for line in sys.stdin:
+    op, *args = line.split()
+    if op == "-gdb-exit":
+        emit("^exit")
+        break
+    elif op == "-gdb-version":
+        emit('~"GNU gdb (fake)\\n"', "^done", "(gdb)")
+    elif op == "-target-attach":
+        emit("^done", '*stopped,frame={addr="0x%x"}' % pc, "(gdb)")
+    elif op == "-break-insert":
+        bkpt = True
+        emit('^done,bkpt={number="1",type="breakpoint",addr="0x%x"}' % pc, "(gdb)")
+    elif op == "-exec-continue":
+        pc += 0x10
+        emit("^running", '*running,thread-id="all"', "(gdb)")
+        threading.Timer(0.1, stopped).start()
+    elif op == "-data-evaluate-expression":
+        emit('^done,value="0x%x"' % pc, "(gdb)")
+    elif op == "-data-list-register-names":
+        emit('^done,register-names=["rax","rsp","","rip"]', "(gdb)")
+    elif op == "-data-list-register-values":
+        values = {"0": 0, "1": 0x7FFC0000, "3": pc}
+        regs = ",".join('{number="%s",value="0x%x"}' % (n, values[n]) for n in args[1:])
+        emit("^done,register-values=[%s]" % regs, "(gdb)")
+    elif op == "-data-read-memory-bytes":
+        emit('^done,memory=[{begin="%s",contents="%s"}]' % (args[0], "%02x" % (pc & 0xFF) * int(args[1])), "(gdb)")
+    else:
+        emit('^error,msg="Undefined MI command: %s"' % op[1:], "(gdb)")
+"""
 
 
-class TestRawCommand(unittest.TestCase):
+class _StallingPoller:
+    """Wraps the reader thread's poll object to hold it after it wakes."""
+
+    def __init__(self, poller):
+        self._poller = poller
+        self.armed = False
+        self.woke = threading.Event()
+        self.resume = threading.Event()
+
+    def poll(self, *args):
+        events = self._poller.poll(*args)
+        # Only the reader's blocking wait (no timeout) is held
+        if events and self.armed and not args:
+            self.armed = False
+            self.woke.set()
+            self.resume.wait(5)
+        return events
+
+
+class _StallingController(gdb_mcp_server.GDBController):
+    def _reader_loop(self):
+        self.stall = self._reader_poller = _StallingPoller(self._reader_poller)
+        super()._reader_loop()
+
+
+class TestControllerFakeGDB(unittest.TestCase):
+    """Test GDBController in-process against a scripted fake GDB."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.fake_gdb = os.path.join(cls.tmpdir.name, "gdb")
+        with open(cls.fake_gdb, "w") as f:
+            f.write(f"#!{sys.executable}\n{_FAKE_GDB}")
+        os.chmod(cls.fake_gdb, 0o755)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def make_controller(self, cls=gdb_mcp_server.GDBController):
+        ctl = cls()
+        ctl.gdb_path = self.fake_gdb
+        ctl.timeout = 5
+        self.addCleanup(ctl.stop)
+        return ctl
+
+    def test_reader_does_not_block_commands(self):
+        """Test that the reader backs off when a command drained the pipe under it."""
+        ctl = self.make_controller(_StallingController)
+        ctl.start()
+        ctl.attach(1)
+
+        # The delayed *stopped wakes the reader, which is held before it
+        # takes the lock; a command then reads that output itself
+        ctl.stall.armed = True
+        ctl.continue_exec()
+        self.assertTrue(ctl.stall.woke.wait(2))
+        ctl.raw_command("-gdb-version")
+        ctl.stall.resume.set()
+        time.sleep(0.05)  # let the reader take the now free lock
+
+        worker = threading.Thread(target=ctl.raw_command, args=("-gdb-version",), daemon=True)
+        worker.start()
+        worker.join(3)
+        self.assertFalse(worker.is_alive(), "command blocked behind the reader thread")
+
+    def test_restart_does_not_leak_startup_output(self):
+        """Test that a restarted session's first command gets only its own response."""
+        ctl = self.make_controller()
+        ctl.start()
+        ctl.raw_command("-gdb-version")
+        # Out-of-band lines are only buffered while start() waits
+        self.assertEqual(len(ctl._out), 0)
+        ctl.stop()
+        ctl.start()
+
+        lines = ctl.raw_command("-gdb-version")["lines"]
+        self.assertEqual(lines[-1], "^done")
+        for line in lines:
+            self.assertFalse(line.startswith(("=thread-group-added", "(gdb)")), line)
+
+    def wait_stopped(self, ctl):
+        deadline = time.monotonic() + 2
+        while not ctl._target_stopped and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(ctl._target_stopped, "target never reported *stopped")
+
+    def test_cache_refreshes_after_continue(self):
+        """Test that register/memory reads are cached until the target runs."""
+        ctl = self.make_controller()
+        ctl.start()
+        ctl.attach(1)
+
+        rip = ctl.read_register("rip")
+        mem = ctl.read_memory("0x1000", 4)
+        self.assertNotIn("cached", rip)
+        self.assertEqual(ctl.read_register("rip"), dict(rip, cached=True))
+        self.assertEqual(ctl.read_memory("0x1000", 4), dict(mem, cached=True))
+
+        ctl.continue_exec()
+        self.wait_stopped(ctl)
+        new_rip = ctl.read_register("rip")
+        new_mem = ctl.read_memory("0x1000", 4)
+        self.assertNotIn("cached", new_rip)
+        self.assertNotEqual(new_rip["value"], rip["value"])
+        self.assertNotIn("cached", new_mem)
+        self.assertNotEqual(new_mem["contents"], mem["contents"])
+
+    def test_hits_for_raw_breakpoints(self):
+        """Test that hits are recorded for breakpoints set through gdb_command."""
+        ctl = self.make_controller()
+        ctl.start()
+        ctl.attach(1)
+        ctl.raw_command("-break-insert main")
+        self.assertEqual(ctl.get_status()["breakpoints"], [])
+
+        ctl.continue_exec()
+        self.wait_stopped(ctl)
+        hits = ctl.get_hits()
+        self.assertEqual(hits["count"], 1)
+        self.assertEqual(hits["hits"][0]["bkptno"], 1)
+
+    def test_read_registers(self):
+        """Test reading several registers in one round trip."""
+        ctl = self.make_controller()
+        ctl.start()
+        ctl.attach(1)
+
+        result = ctl.read_registers(["rip", "rsp"])
+        self.assertEqual(result, {"registers": {"rip": "0x401000", "rsp": "0x7ffc0000"}})
+        self.assertEqual(ctl.read_registers(["rip"])["registers"]["rip"], ctl.read_register("rip")["value"])
+        self.assertIn("error", ctl.read_registers(["bogus"]))
+
+    def test_cache_skips_values_read_across_a_run(self):
+        """Test that a value is not cached if the target ran while it was read."""
+        ctl = self.make_controller()
+        ctl.start()
+        ctl.attach(1)
+
+        send = ctl._send_command
+
+        def send_then_run(cmd):
+            lines = send(cmd)
+            # The reader handles a run/stop cycle before the caller caches
+            ctl._track_exec_state(b'*running,thread-id="all"')
+            ctl._track_exec_state(b'*stopped,reason="signal-received"')
+            return lines
+
+        ctl._send_command = send_then_run
+        ctl.read_register("rip")
+        ctl.read_memory("0x1000", 4)
+        del ctl._send_command
+
+        self.assertNotIn("cached", ctl.read_register("rip"))
+        self.assertNotIn("cached", ctl.read_memory("0x1000", 4))
+
+
+@unittest.skipUnless(HAS_GDB, "gdb not installed")
+class TestRawCommand(_RPCMixin, unittest.TestCase):
     """Test raw GDB command execution."""
 
-    def setUp(self):
-        self.server = subprocess.Popen(
-            [sys.executable, "/root/gdb/gdb_mcp_server.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-        )
-
-    def tearDown(self):
-        self.call_tool("gdb_stop")
-        self.server.terminate()
-        self.server.wait()
-
-    def call_tool(self, name: str, arguments: dict = None) -> dict:
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "id": 1,
-            "params": {"name": name, "arguments": arguments or {}},
-        }
-        self.server.stdin.write(json.dumps(request).encode() + b"\n")
-        self.server.stdin.flush()
-        response_line = self.server.stdout.readline()
-        response = json.loads(response_line)
-        if "result" in response and "content" in response["result"]:
-            return json.loads(response["result"]["content"][0]["text"])
-        return response
+    @classmethod
+    def setUpClass(cls):
+        cls.rfile, cls.wfile = _server.stdout, _server.stdin
 
     def test_raw_command(self):
         """Test executing raw GDB commands."""
@@ -300,11 +796,14 @@ class TestRawCommand(unittest.TestCase):
         result = self.call_tool("gdb_command", {"command": "-gdb-version"})
         self.assertIn("lines", result)
         self.assertIsInstance(result["lines"], list)
+        # The shared server has been stopped and restarted by earlier tests;
+        # startup records of this session must not leak into the response
+        for line in result["lines"]:
+            self.assertFalse(line.startswith(("=thread-group-added", "(gdb)")), line)
 
 
 if __name__ == "__main__":
-    # Check if running as root (required for ptrace)
-    if os.geteuid() != 0:
-        print("Warning: Some tests require root privileges for ptrace")
+    if not HAS_PTRACE:
+        print("Warning: ptrace unavailable, attach tests will be skipped")
 
     unittest.main(verbosity=2)